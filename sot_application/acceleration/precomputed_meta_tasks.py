@@ -2,14 +2,13 @@
 
 # Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
 
-from numpy import eye
+from numpy import full, zeros
 
 from dynamic_graph import plug
-from dynamic_graph.sot.core.feature_generic import FeatureGeneric
-from dynamic_graph.sot.core.matrix_util import matrixToTuple
-from dynamic_graph.sot.dyninv import SolverKine, TaskDynInequality, TaskDynLimits
-from dynamic_graph.sot.dyninv.meta_task_dyn_6d import MetaTaskDyn6d
-from dynamic_graph.sot.dyninv.meta_tasks_dyn import MetaTaskDynCom, MetaTaskDynPosture
+from dynamic_graph.sot.dyninv import SolverKine
+
+from sot_application import build_plan
+from sot_application.signal_util import asMatrix, setVector, vectorValue
 
 
 class Solver:
@@ -93,8 +92,8 @@ def setTaskLim(taskLim, robot):
     taskLim.dt.value = robot.timeStep
     robot.dynamic.upperJl.recompute(0)
     robot.dynamic.lowerJl.recompute(0)
-    taskLim.referencePosInf.value = robot.dynamic.lowerJl.value
-    taskLim.referencePosSup.value = robot.dynamic.upperJl.value
+    setVector(taskLim.referencePosInf, vectorValue(robot.dynamic.lowerJl))
+    setVector(taskLim.referencePosSup, vectorValue(robot.dynamic.upperJl))
     # dqup = (
     # 0,
     # 0,
@@ -133,9 +132,9 @@ def setTaskLim(taskLim, robot):
     # 180,
     # 330,
     # )
-    dqup = (1000,) * robot.dimension
-    taskLim.referenceVelInf.value = tuple([-val * 3.14 / 180 for val in dqup])
-    taskLim.referenceVelSup.value = tuple([val * 3.14 / 180 for val in dqup])
+    dqup = full(robot.dimension, 1000.0)
+    setVector(taskLim.referenceVelInf, -dqup * 3.14 / 180)
+    setVector(taskLim.referenceVelSup, dqup * 3.14 / 180)
     taskLim.controlGain.value = 0.3
 
 
@@ -144,100 +143,98 @@ def setContacts(contactLF, contactRF):
     Sets the parameters for teh contacts
     """
     # Left foot
-    contactLF.featureDes.velocity.value = (0, 0, 0, 0, 0, 0)
+    setVector(contactLF.featureDes.velocity, zeros(6))
     contactLF.feature.frame("desired")
     contactLF.name = "LF"
 
     # Right foot
-    contactRF.featureDes.velocity.value = (0, 0, 0, 0, 0, 0)
+    setVector(contactRF.featureDes.velocity, zeros(6))
     contactRF.feature.frame("desired")
     contactRF.name = "RF"
 
-    contactRF.support = (
-        (0.11, -0.08, -0.08, 0.11),
-        (-0.045, -0.045, 0.07, 0.07),
-        (-0.105, -0.105, -0.105, -0.105),
+    contactRF.support = asMatrix(
+        (
+            (0.11, -0.08, -0.08, 0.11),
+            (-0.045, -0.045, 0.07, 0.07),
+            (-0.105, -0.105, -0.105, -0.105),
+        )
     )
-    contactLF.support = (
-        (0.11, -0.08, -0.08, 0.11),
-        (-0.07, -0.07, 0.045, 0.045),
-        (-0.105, -0.105, -0.105, -0.105),
+    contactLF.support = asMatrix(
+        (
+            (0.11, -0.08, -0.08, 0.11),
+            (-0.07, -0.07, 0.045, 0.045),
+            (-0.105, -0.105, -0.105, -0.105),
+        )
     )
 
     # Imposed errordot = 0
-    contactLF.feature.errordot.value = (0, 0, 0, 0, 0, 0)
-    contactRF.feature.errordot.value = (0, 0, 0, 0, 0, 0)
+    setVector(contactLF.feature.errordot, zeros(6))
+    setVector(contactRF.feature.errordot, zeros(6))
+
+
+# Control graph built by createTasks and createBalanceAndPosture
+# (see sot_application.build_plan).
+balanceAndPosturePlan = {
+    "level": "acceleration",
+    "tasks": {
+        "waist": {"type": "6d", "opPoint": "waist", "joint": "waist", "gain": 10},
+        "chest": {"type": "6d", "opPoint": "chest", "joint": "chest", "gain": 10},
+        "rh": {
+            "type": "6d",
+            "opPoint": "rh",
+            "joint": "right-wrist",
+            "gain": 10,
+            "offset": (0, 0, -0.14),
+        },
+        "lh": {
+            "type": "6d",
+            "opPoint": "lh",
+            "joint": "left-wrist",
+            "gain": 10,
+            "offset": (0, 0, -0.14),
+        },
+        "com": {"type": "com", "gain": 10, "selec": "011"},
+        "posture": {"type": "posture", "gain": 5},
+        "taskHeight": {
+            "type": "height",
+            "selec": "100",
+            "inf": (0.0, 0.0, 0.0),
+            "sup": (0.0, 0.0, 0.80771),
+        },
+    },
+    "contacts": {
+        "contactLF": {
+            "opPoint": "lf",
+            "joint": "left-ankle",
+            "name": "LF",
+            "support": (
+                (0.11, -0.08, -0.08, 0.11),
+                (-0.07, -0.07, 0.045, 0.045),
+                (-0.105, -0.105, -0.105, -0.105),
+            ),
+        },
+        "contactRF": {
+            "opPoint": "rf",
+            "joint": "right-ankle",
+            "name": "RF",
+            "support": (
+                (0.11, -0.08, -0.08, 0.11),
+                (-0.045, -0.045, 0.07, 0.07),
+                (-0.105, -0.105, -0.105, -0.105),
+            ),
+        },
+    },
+    "limits": True,
+    "stack": ["taskLim", "com", "posture"],
+}
 
 
 def createTasks(robot):
-
-    # MetaTasks dictonary
-    robot.mTasks = dict()
-    robot.tasksIne = dict()
-
-    # Foot contacts
-    robot.contactLF = MetaTaskDyn6d("contactLF", robot.dynamic, "lf", "left-ankle")
-    robot.contactRF = MetaTaskDyn6d("contactRF", robot.dynamic, "rf", "right-ankle")
-    setContacts(robot.contactLF, robot.contactRF)
-
-    # MetaTasksDyn6d for other operational points
-    robot.mTasks["waist"] = MetaTaskDyn6d("waist", robot.dynamic, "waist", "waist")
-    robot.mTasks["chest"] = MetaTaskDyn6d("chest", robot.dynamic, "chest", "chest")
-    robot.mTasks["rh"] = MetaTaskDyn6d("rh", robot.dynamic, "rh", "right-wrist")
-    robot.mTasks["lh"] = MetaTaskDyn6d("lh", robot.dynamic, "lh", "left-wrist")
-
-    for taskName in robot.mTasks:
-        robot.mTasks[taskName].feature.frame("desired")
-        robot.mTasks[taskName].gain.setConstant(10)
-        robot.mTasks[taskName].task.dt.value = robot.timeStep
-        robot.mTasks[taskName].featureDes.velocity.value = (0, 0, 0, 0, 0, 0)
-
-    handMgrip = eye(4)
-    handMgrip[0:3, 3] = (0, 0, -0.14)
-    robot.mTasks["rh"].opmodif = matrixToTuple(handMgrip)
-    robot.mTasks["lh"].opmodif = matrixToTuple(handMgrip)
-
-    # CoM Task
-    robot.mTasks["com"] = MetaTaskDynCom(robot.dynamic, robot.timeStep)
-    robot.dynamic.com.recompute(0)
-    robot.mTasks["com"].featureDes.errorIN.value = robot.dynamic.com.value
-    robot.mTasks["com"].task.controlGain.value = 10
-    robot.mTasks["com"].feature.selec.value = "011"
-
-    # Posture Task
-    robot.mTasks["posture"] = MetaTaskDynPosture(robot.dynamic, robot.timeStep)
-    robot.mTasks["posture"].ref = robot.halfSitting
-    robot.mTasks["posture"].gain.setConstant(5)
-
-    # TASK INEQUALITY
-
-    # Task Height
-    featureHeight = FeatureGeneric("featureHeight")
-    plug(robot.dynamic.com, featureHeight.errorIN)
-    plug(robot.dynamic.Jcom, featureHeight.jacobianIN)
-    robot.tasksIne["taskHeight"] = TaskDynInequality("taskHeight")
-    plug(robot.dynamic.velocity, robot.tasksIne["taskHeight"].qdot)
-    robot.tasksIne["taskHeight"].add(featureHeight.name)
-    robot.tasksIne["taskHeight"].selec.value = "100"
-    robot.tasksIne["taskHeight"].referenceInf.value = (0.0, 0.0, 0.0)  # Xmin, Ymin
-    robot.tasksIne["taskHeight"].referenceSup.value = (0.0, 0.0, 0.80771)  # Xmax, Ymax
-    robot.tasksIne["taskHeight"].dt.value = robot.timeStep
+    build_plan.compilePlan(balanceAndPosturePlan).createTasks(robot)
 
 
 def createBalanceAndPosture(robot, solver):
-
-    solver.clear()
-
-    # Task Limits
-    robot.taskLim = TaskDynLimits("taskLim")
-    setTaskLim(robot.taskLim, robot)
-
-    # --- push tasks --- #
-    solver.sot.addContact(robot.contactLF)
-    solver.sot.addContact(robot.contactRF)
-    solver.push(robot.taskLim)
-    solver.push(robot.mTasks["com"].task)
-    solver.push(robot.mTasks["posture"].task)
+    build_plan.compilePlan(balanceAndPosturePlan).createStack(robot, solver)
 
 
 def initialize(robot):
@@ -0,0 +1,585 @@
+#!/usr/bin/env python
+
+# Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
+
+"""
+Declarative description of control graphs.
+
+A specification is a dictionary (or a JSON file) describing the tasks, the
+contacts and the stack of a controller:
+
+  {
+    "level": "acceleration",
+    "tasks": {
+      "rh": {"type": "6d", "opPoint": "rh", "joint": "right-wrist",
+             "gain": 10, "offset": [0, 0, -0.14]},
+      "com": {"type": "com", "gain": 10, "selec": "011"},
+      "posture": {"type": "posture", "gain": 5},
+      "taskHeight": {"type": "height", "selec": "100",
+                     "inf": [0, 0, 0], "sup": [0, 0, 0.80771]}
+    },
+    "contacts": {
+      "contactLF": {"opPoint": "lf", "joint": "left-ankle", "name": "LF"}
+    },
+    "limits": true,
+    "stack": ["taskLim", "com", "posture"]
+  }
+
+Contact keys start with "contact" and become attributes of the robot.
+Contacts are added to the solver in the alphabetical order of their keys.
+At acceleration and torque level, a contact may give its "name" and its
+"support" polygon. At torque level, it may give in "force" the name of the
+signal of the device measuring its wrench.
+
+A plan has at most one "com" and one "posture" task, whose entities have
+fixed names.
+
+The specification is compiled once by 'compilePlan' (or 'loadPlan') into a
+validated 'BuildPlan', which is cached: all the checks and conversions are
+done at compilation, and variants are reviewed as data. Building a plan
+still creates and configures the entities one by one through the same
+Python calls as the hand-written builders, grouped by kind of setting.
+"""
+
+import json
+import os
+
+from numpy import array, eye, zeros
+
+from dynamic_graph import plug
+from dynamic_graph.sot.core.feature_generic import FeatureGeneric
+from dynamic_graph.sot.core.meta_task_posture import MetaTaskKinePosture
+from dynamic_graph.sot.core.meta_tasks_kine import MetaTaskKine6d, MetaTaskKineCom
+from dynamic_graph.sot.dyninv import (
+    TaskDynInequality,
+    TaskDynLimits,
+    TaskInequality,
+    TaskJointLimits,
+)
+from dynamic_graph.sot.dyninv.meta_task_dyn_6d import MetaTaskDyn6d
+from dynamic_graph.sot.dyninv.meta_tasks_dyn import MetaTaskDynCom, MetaTaskDynPosture
+
+from sot_application.signal_util import asMatrix, asVector, setVector, vectorValue
+
+LEVELS = ("velocity", "acceleration", "torque")
+DYNAMIC_LEVELS = ("acceleration", "torque")
+
+# Task type -> (required keys, optional keys)
+TASK_KEYS = {
+    "6d": (("opPoint", "joint"), ("frame", "gain", "selec", "offset", "opmodif")),
+    "com": ((), ("gain", "selec")),
+    "posture": ((), ("gain",)),
+    "height": ((), ("selec", "inf", "sup")),
+}
+CONTACT_KEYS = (("opPoint", "joint"), ("name", "gain", "support", "force"))
+FRAMES = ("current", "desired")
+PLAN_KEYS = ("level", "tasks", "contacts", "limits", "stack")
+LIMITS = "taskLim"
+
+_plans = dict()
+_files = dict()
+
+
+def _normalize(value):
+    """
+    Convert arrays and tuples of a specification into lists
+    """
+    if isinstance(value, dict):
+        return dict((key, _normalize(v)) for key, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "tolist"):
+        return _normalize(value.tolist())
+    return value
+
+
+def _check(condition, message, *args):
+    if not condition:
+        raise ValueError(message.format(*args))
+
+
+def _checkKeys(entry, what, required, optional):
+    _check(isinstance(entry, dict), "{0}: expected a dictionary", what)
+    for key in required:
+        _check(key in entry, "{0}: missing key '{1}'", what, key)
+    for key in entry:
+        _check(
+            key in required or key in optional or key == "type",
+            "{0}: unknown key '{1}'",
+            what,
+            key,
+        )
+
+
+def _checkSelec(selec, what):
+    _check(
+        isinstance(selec, str) and selec and set(selec) <= set("01"),
+        "{0}: selec must be a string of '0' and '1'",
+        what,
+    )
+
+
+def _number(value, what):
+    _check(
+        isinstance(value, (int, float)) and not isinstance(value, bool),
+        "{0}: expected a number, got {1!r}",
+        what,
+        value,
+    )
+    return float(value)
+
+
+def _vector(value, size, what):
+    _check(
+        isinstance(value, (list, tuple)) and len(value) == size,
+        "{0}: expected a vector of size {1}",
+        what,
+        size,
+    )
+    return tuple(_number(x, what) for x in value)
+
+
+def _heightFeatureName(key):
+    """
+    Name of the feature of a height task, e.g. 'featureHeight' for
+    'taskHeight'
+    """
+    if key.startswith("task"):
+        return "feature" + key[len("task") :]
+    return "feature" + key
+
+
+def _matrix(value, rows, cols, what):
+    _check(
+        isinstance(value, (list, tuple)) and len(value) == rows,
+        "{0}: expected a {1}x{2} matrix",
+        what,
+        rows,
+        cols,
+    )
+    return tuple(_vector(row, cols, what) for row in value)
+
+
+def _opmodif(entry, what):
+    """
+    Return the transformation of the operational point, or None
+    """
+    _check(
+        not ("offset" in entry and "opmodif" in entry),
+        "{0}: 'offset' and 'opmodif' are exclusive",
+        what,
+    )
+    if "opmodif" in entry:
+        return array(_matrix(entry["opmodif"], 4, 4, what))
+    if "offset" in entry:
+        m = eye(4)
+        m[0:3, 3] = _vector(entry["offset"], 3, what)
+        return m
+    return None
+
+
+class BuildPlan(object):
+    """
+    Validated and grouped description of a control graph
+
+    Use 'compilePlan' or 'loadPlan' rather than the constructor, so that
+    plans are shared between identical specifications.
+    """
+
+    def __init__(self, spec):
+        spec = _normalize(spec)
+        _checkKeys(spec, "plan", ("level", "stack"), PLAN_KEYS)
+        _check(spec["level"] in LEVELS, "plan: unknown level '{0}'", spec["level"])
+        self.level = spec["level"]
+        self.limits = bool(spec.get("limits", False))
+
+        # Creation batches: (key, arguments), one list per task type.
+        self.creations = dict((taskType, list()) for taskType in TASK_KEYS)
+        # Setting batches: (key, value), one list per setting.
+        self.frames = list()
+        self.gains = list()
+        self.controlGains = list()
+        self.selecs = list()
+        self.opmodifs = list()
+        self.bounds = list()
+
+        tasks = spec.get("tasks", dict())
+        _check(isinstance(tasks, dict), "plan: 'tasks' must be a dictionary")
+        for key, entry in tasks.items():
+            what = "task '{0}'".format(key)
+            _check(key != LIMITS, "{0}: '{1}' is reserved", what, LIMITS)
+            _check(
+                isinstance(entry, dict) and entry.get("type") in TASK_KEYS,
+                "{0}: type must be one of {1}",
+                what,
+                sorted(TASK_KEYS),
+            )
+            taskType = entry["type"]
+            _checkKeys(entry, what, *TASK_KEYS[taskType])
+            self._compileTask(key, taskType, entry, what)
+        for taskType in ("com", "posture"):
+            _check(
+                len(self.creations[taskType]) <= 1,
+                "plan: at most one '{0}' task",
+                taskType,
+            )
+        features = [feature for _, (feature,) in self.creations["height"]]
+        _check(
+            len(set(features)) == len(features),
+            "plan: height tasks with the same feature name {0}",
+            sorted(features),
+        )
+
+        self.contacts = list()
+        contacts = spec.get("contacts", dict())
+        _check(isinstance(contacts, dict), "plan: 'contacts' must be a dictionary")
+        for attribute, entry in contacts.items():
+            what = "contact '{0}'".format(attribute)
+            _check(
+                isinstance(attribute, str)
+                and attribute.startswith("contact")
+                and attribute.isidentifier(),
+                "{0}: key must be an identifier starting with 'contact'",
+                what,
+            )
+            _check(attribute not in tasks, "{0}: key is also a task", what)
+            _checkKeys(entry, what, *CONTACT_KEYS)
+            if self.level not in DYNAMIC_LEVELS:
+                for key in ("name", "support"):
+                    _check(
+                        key not in entry,
+                        "{0}: '{1}' is only used at acceleration and torque level",
+                        what,
+                        key,
+                    )
+            if self.level != "torque":
+                _check(
+                    "force" not in entry,
+                    "{0}: 'force' is only used at torque level",
+                    what,
+                )
+            name = entry.get("name", attribute)
+            _check(isinstance(name, str) and name, "{0}: invalid name", what)
+            support = entry.get("support")
+            if support is not None:
+                _check(
+                    isinstance(support, list)
+                    and len(support) == 3
+                    and isinstance(support[0], list)
+                    and len(support[0]) > 0,
+                    "{0}: support must be a 3xN matrix with N > 0",
+                    what,
+                )
+                support = asMatrix(_matrix(support, 3, len(support[0]), what))
+            gain = None
+            if "gain" in entry:
+                gain = _number(entry["gain"], what)
+            force = entry.get("force")
+            if force is not None:
+                _check(isinstance(force, str), "{0}: force must be a signal name", what)
+            self.contacts.append(
+                (
+                    attribute,
+                    entry["opPoint"],
+                    entry["joint"],
+                    name,
+                    gain,
+                    support,
+                    force,
+                )
+            )
+        self.contacts.sort()
+        names = [contact[3] for contact in self.contacts]
+        _check(
+            len(set(names)) == len(names), "plan: duplicated contact name {0}", names
+        )
+
+        _check(isinstance(spec["stack"], list), "plan: 'stack' must be a list")
+        self.stack = tuple(spec["stack"])
+        for key in self.stack:
+            _check(
+                key in tasks or (key == LIMITS and self.limits),
+                "stack: unknown task '{0}'",
+                key,
+            )
+        _check(len(set(self.stack)) == len(self.stack), "stack: duplicated task")
+
+        # Signals of the dynamic entity to evaluate before the creations.
+        self.recomputes = list()
+        if self.creations["com"] or self.creations["height"]:
+            self.recomputes.append("com")
+
+    def _compileTask(self, key, taskType, entry, what):
+        if "selec" in entry:
+            _checkSelec(entry["selec"], what)
+            self.selecs.append((key, entry["selec"]))
+        if taskType == "6d":
+            self.creations["6d"].append((key, (entry["opPoint"], entry["joint"])))
+            frame = entry.get("frame", "desired")
+            _check(frame in FRAMES, "{0}: frame must be one of {1}", what, FRAMES)
+            self.frames.append((key, frame))
+            if "gain" in entry:
+                self.gains.append((key, _number(entry["gain"], what)))
+            opmodif = _opmodif(entry, what)
+            if opmodif is not None:
+                self.opmodifs.append((key, opmodif))
+        elif taskType == "com":
+            self.creations["com"].append((key, ()))
+            if "gain" in entry:
+                self.controlGains.append((key, _number(entry["gain"], what)))
+        elif taskType == "posture":
+            self.creations["posture"].append((key, ()))
+            if "gain" in entry:
+                self.gains.append((key, _number(entry["gain"], what)))
+        elif taskType == "height":
+            self.creations["height"].append((key, (_heightFeatureName(key),)))
+            self.bounds.append(
+                (
+                    key,
+                    array(_vector(entry.get("inf", (0.0, 0.0, 0.0)), 3, what)),
+                    array(_vector(entry.get("sup", (0.0, 0.0, 0.0)), 3, what)),
+                )
+            )
+
+    def build(self, robot, solver):
+        """
+        Create the entities of the plan and push them into 'solver'.
+        """
+        self.createTasks(robot)
+        self.createStack(robot, solver)
+
+    def createTasks(self, robot):
+        """
+        Create and configure the tasks and contacts of the plan.
+
+        Equality tasks are stored into 'robot.mTasks', inequality tasks into
+        'robot.tasksIne' and contacts into the robot attribute named by their
+        key.
+        """
+        toolkit = _toolkits[self.level]
+
+        for name in self.recomputes:
+            robot.dynamic.signal(name).recompute(0)
+
+        # --- creations --- #
+        robot.mTasks = dict()
+        robot.tasksIne = dict()
+        for key, (opPoint, joint) in self.creations["6d"]:
+            robot.mTasks[key] = toolkit.create6d(robot, key, opPoint, joint)
+        for key, _ in self.creations["com"]:
+            robot.mTasks[key] = toolkit.createCom(robot)
+        for key, _ in self.creations["posture"]:
+            robot.mTasks[key] = toolkit.createPosture(robot)
+        for key, (feature,) in self.creations["height"]:
+            robot.tasksIne[key] = toolkit.createHeight(robot, key, feature)
+        for attribute, opPoint, joint, name, gain, support, _ in self.contacts:
+            contact = toolkit.create6d(robot, attribute, opPoint, joint)
+            toolkit.setContact(contact, name, gain, support)
+            setattr(robot, attribute, contact)
+
+        # --- settings --- #
+        tasks = dict(robot.mTasks, **robot.tasksIne)
+        for key, frame in self.frames:
+            tasks[key].feature.frame(frame)
+        for key, _ in self.creations["6d"]:
+            toolkit.set6d(robot, tasks[key])
+        for key, gain in self.gains:
+            tasks[key].gain.setConstant(gain)
+        for key, gain in self.controlGains:
+            tasks[key].task.controlGain.value = gain
+        for key, selec in self.selecs:
+            if key in robot.tasksIne:
+                tasks[key].selec.value = selec
+            else:
+                tasks[key].feature.selec.value = selec
+        for key, opmodif in self.opmodifs:
+            tasks[key].opmodif = opmodif
+        for key, inf, sup in self.bounds:
+            setVector(tasks[key].referenceInf, inf)
+            setVector(tasks[key].referenceSup, sup)
+        com = vectorValue(robot.dynamic.com) if self.creations["com"] else None
+        for key, _ in self.creations["com"]:
+            setVector(tasks[key].featureDes.errorIN, com)
+        for key, _ in self.creations["posture"]:
+            tasks[key].ref = asVector(robot.halfSitting)
+
+    def createStack(self, robot, solver, forces=None):
+        """
+        Create the limits into 'robot.taskLim', then replace the content of
+        'solver' by the contacts and the stack of the plan.
+
+        At torque level, 'forces' optionally maps contact names to the
+        signals of their wrenches, and takes precedence over the "force"
+        entries of the plan.
+        """
+        if forces is None:
+            forces = dict()
+        _check(
+            self.level == "torque" or not forces,
+            "forces are only used at torque level",
+        )
+        solver.clear()
+        if self.limits:
+            robot.taskLim = _toolkits[self.level].createLimits(robot)
+        for attribute, _, _, name, _, _, force in self.contacts:
+            contact = getattr(robot, attribute)
+            if self.level != "torque":
+                solver.sot.addContact(contact)
+            elif name in forces:
+                solver.addContact(contact, forces[name])
+            elif force is not None:
+                solver.addContact(contact, robot.device.signal(force))
+            else:
+                solver.addContact(contact)
+        for key in self.stack:
+            if key == LIMITS:
+                solver.push(robot.taskLim)
+            elif key in robot.tasksIne:
+                solver.push(robot.tasksIne[key])
+            else:
+                solver.push(robot.mTasks[key].task)
+
+
+class _VelocityToolkit(object):
+    """
+    Entity factories of kinematic (velocity) control graphs
+    """
+
+    MetaTask6d = MetaTaskKine6d
+    MetaTaskCom = MetaTaskKineCom
+    MetaTaskPosture = MetaTaskKinePosture
+    TaskInequality = TaskInequality
+    TaskLimits = TaskJointLimits
+
+    def setTaskLim(self, taskLim, robot):
+        from sot_application.velocity.precomputed_meta_tasks import setTaskLim
+
+        setTaskLim(taskLim, robot)
+
+    def create6d(self, robot, name, opPoint, joint):
+        return self.MetaTask6d(
+            name, robot.dynamic, opPoint, robot.OperationalPointsMap[joint]
+        )
+
+    def set6d(self, robot, task):
+        pass
+
+    def setContact(self, contact, name, gain, support):
+        contact.feature.frame("desired")
+        contact.gain.setConstant(10 if gain is None else gain)
+
+    def createCom(self, robot):
+        return self.MetaTaskCom(robot.dynamic)
+
+    def createPosture(self, robot):
+        return self.MetaTaskPosture(robot.dynamic)
+
+    def createHeight(self, robot, name, featureName):
+        feature = FeatureGeneric(featureName)
+        plug(robot.dynamic.com, feature.errorIN)
+        plug(robot.dynamic.Jcom, feature.jacobianIN)
+        task = self.TaskInequality(name)
+        task.add(feature.name)
+        task.dt.value = robot.timeStep
+        return task
+
+    def createLimits(self, robot):
+        taskLim = self.TaskLimits(LIMITS)
+        self.setTaskLim(taskLim, robot)
+        return taskLim
+
+
+class _AccelerationToolkit(_VelocityToolkit):
+    """
+    Entity factories of dynamic (acceleration and torque) control graphs
+    """
+
+    MetaTask6d = MetaTaskDyn6d
+    MetaTaskCom = MetaTaskDynCom
+    MetaTaskPosture = MetaTaskDynPosture
+    TaskInequality = TaskDynInequality
+    TaskLimits = TaskDynLimits
+
+    def setTaskLim(self, taskLim, robot):
+        from sot_application.acceleration.precomputed_meta_tasks import setTaskLim
+
+        setTaskLim(taskLim, robot)
+
+    def create6d(self, robot, name, opPoint, joint):
+        return self.MetaTask6d(name, robot.dynamic, opPoint, joint)
+
+    def set6d(self, robot, task):
+        task.task.dt.value = robot.timeStep
+        setVector(task.featureDes.velocity, zeros(6))
+
+    def setContact(self, contact, name, gain, support):
+        setVector(contact.featureDes.velocity, zeros(6))
+        contact.feature.frame("desired")
+        contact.name = name
+        if gain is not None:
+            contact.gain.setConstant(gain)
+        if support is not None:
+            contact.support = support
+        # Imposed errordot = 0
+        setVector(contact.feature.errordot, zeros(6))
+
+    def createCom(self, robot):
+        return self.MetaTaskCom(robot.dynamic, robot.timeStep)
+
+    def createPosture(self, robot):
+        return self.MetaTaskPosture(robot.dynamic, robot.timeStep)
+
+    def createHeight(self, robot, name, featureName):
+        task = _VelocityToolkit.createHeight(self, robot, name, featureName)
+        plug(robot.dynamic.velocity, task.qdot)
+        return task
+
+
+_toolkits = {
+    "velocity": _VelocityToolkit(),
+    "acceleration": _AccelerationToolkit(),
+    "torque": _AccelerationToolkit(),
+}
+
+
+def compilePlan(spec):
+    """
+    Validate 'spec' and return the corresponding build plan.
+
+    Plans are cached: compiling an identical specification twice returns
+    the same object, whatever the order of its keys and whether its vectors
+    and matrices are given as tuples, lists or arrays.
+    """
+    key = json.dumps(_normalize(spec), sort_keys=True)
+    if key not in _plans:
+        _plans[key] = BuildPlan(json.loads(key))
+    return _plans[key]
+
+
+def loadPlan(filename):
+    """
+    Read a JSON specification and return the corresponding build plan.
+
+    The file is parsed again only if it was modified since the last call.
+    """
+    filename = os.path.abspath(filename)
+    mtime = os.path.getmtime(filename)
+    if filename not in _files or _files[filename][0] != mtime:
+        with open(filename) as f:
+            _files[filename] = (mtime, compilePlan(json.load(f)))
+    return _files[filename][1]
+
+
+def build(robot, solver, spec):
+    """
+    Build the control graph described by 'spec' (a dictionary, a file name
+    or a BuildPlan) and push its tasks into 'solver'.
+    """
+    if isinstance(spec, BuildPlan):
+        plan = spec
+    elif isinstance(spec, dict):
+        plan = compilePlan(spec)
+    else:
+        plan = loadPlan(spec)
+    plan.build(robot, solver)
+    return plan
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
+
+"""
+Read and write vector and matrix signals as contiguous NumPy arrays.
+
+Values are passed to the signals as float64 arrays, without conversion to
+nested tuples. For values written at every tick, use SignalWriter, which
+reuses the same preallocated array. Reading a signal always allocates the
+array returned by the signal; it is returned without further conversion.
+"""
+
+from numpy import asarray, ascontiguousarray, copyto, zeros
+
+
+def vectorValue(signal):
+    """
+    Returns the value of a vector signal as a float64 array
+    """
+    return asarray(signal.value, dtype=float).reshape(-1)
+
+
+def matrixValue(signal):
+    """
+    Returns the value of a matrix signal as a 2d float64 array
+    """
+    return asarray(signal.value, dtype=float)
+
+
+def asVector(value):
+    """
+    Returns an array-like as a contiguous 1d float64 array, without copy if
+    it already is one.
+    """
+    return ascontiguousarray(value, dtype=float).reshape(-1)
+
+
+def asMatrix(value):
+    """
+    Returns a 2d array-like as a contiguous float64 array, without copy if
+    it already is one.
+    """
+    return ascontiguousarray(value, dtype=float)
+
+
+def setVector(signal, value):
+    """
+    Sets the value of a vector signal from an array-like
+    """
+    signal.value = asVector(value)
+
+
+def setMatrix(signal, value):
+    """
+    Sets the value of a matrix signal from a 2d array-like
+    """
+    signal.value = asMatrix(value)
+
+
+class SignalWriter(object):
+    """
+    Writes values to a vector or matrix signal through a preallocated array
+
+    Either fill 'buffer' in place and call 'write()', or call
+    'write(value)' to copy 'value' into the buffer first. The buffer is
+    initialized to zero.
+    """
+
+    def __init__(self, signal, shape):
+        self.signal = signal
+        self.buffer = zeros(shape, dtype=float)
+
+    def write(self, value=None):
+        if value is not None:
+            copyto(self.buffer, value)
+        self.signal.value = self.buffer
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+# Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
+
+from dynamic_graph import plug
+from dynamic_graph.sot.core.operator import (
+    Add_of_vector,
+    MatrixTranspose,
+    Multiply_matrix_vector,
+    Selec_of_vector,
+)
+
+from sot_application import build_plan
+from sot_application.acceleration import precomputed_meta_tasks as acceleration
+from sot_application.acceleration.precomputed_meta_tasks import (  # noqa: F401
+    setContacts,
+    setTaskLim,
+)
+from sot_application.signal_util import asVector
+
+
+class Solver(acceleration.Solver):
+    """
+    Acceleration-level solver followed by an inverse dynamics stage
+
+    The generalized forces are computed from the solver acceleration and
+    the contact forces:
+
+      torque = inertia * ddq + dynamicDrift - sum_c J_c^T f_c
+
+    The inertia matrix and the nonlinear effects are read from the
+    'inertia' and 'dynamicDrift' signals of the dynamic entity: they are
+    evaluated once per tick and shared with the rest of the graph instead
+    of being recomputed.
+
+    'torque.sout' includes the 6 rows of the floating base, which should
+    be close to zero when the contact forces are consistent. The torques of
+    the actuated joints, without these rows, are available on
+    'jointTorque.sout'. The device is still controlled in acceleration.
+    """
+
+    def __init__(self, robot):
+        acceleration.Solver.__init__(self, robot)
+
+        # M * ddq
+        self.inertiaAcceleration = Multiply_matrix_vector("torque_inertia_acc")
+        plug(self.robot.dynamic.inertia, self.inertiaAcceleration.sin1)
+        plug(self.sot.control, self.inertiaAcceleration.sin2)
+
+        # M * ddq + b - sum_c J_c^T f_c
+        # J_c^T f_c entities, kept by contact name to be reused after clear()
+        self.contactProducts = dict()
+        self.contactForces = list()
+        self.torque = Add_of_vector("torque")
+        self._plugTorque()
+
+        # Actuated joints only
+        self.jointTorque = Selec_of_vector("torque_joints")
+        self.jointTorque.selec(6, self.robot.dimension)
+        plug(self.torque.sout, self.jointTorque.sin)
+
+    def _plugTorque(self):
+        """
+        Plug the inertial, nonlinear and contact terms into the torque sum
+        """
+        terms = [self.inertiaAcceleration.sout, self.robot.dynamic.dynamicDrift]
+        terms += [self.contactProducts[name][1].sout for name in self.contactForces]
+        self.torque.setSignalNumber(len(terms))
+        self.torque.setCoeffs(asVector((1, 1) + (-1,) * len(self.contactForces)))
+        for i, term in enumerate(terms):
+            plug(term, self.torque.signal("sin{0}".format(i)))
+
+    def addContact(self, contact, force=None):
+        """
+        Add a contact to the sot.
+
+        If 'force' is given, it is the signal of the 6d wrench applied by
+        the environment on the contact, expressed in the frame of the
+        Jacobian of the contact operational point. Its contribution is
+        subtracted from the joint torques.
+        """
+        self.sot.addContact(contact)
+        if force is None:
+            return
+        if contact.name not in self.contactProducts:
+            name = "torque_{0}".format(contact.name)
+            transpose = MatrixTranspose(name + "_Jt")
+            product = Multiply_matrix_vector(name + "_Jtf")
+            plug(transpose.sout, product.sin1)
+            self.contactProducts[contact.name] = (transpose, product)
+        transpose, product = self.contactProducts[contact.name]
+        plug(self.robot.dynamic.signal("J" + contact.opPoint), transpose.sin)
+        plug(force, product.sin2)
+        if contact.name not in self.contactForces:
+            self.contactForces.append(contact.name)
+        self._plugTorque()
+
+    def clear(self):
+        """
+        Proxy method to remove all tasks from the sot
+        """
+        self.sot.clear()
+        if self.contactForces:
+            self.contactForces = list()
+            self._plugTorque()
+
+
+# Control graph built by createTasks and createBalanceAndPosture
+# (see sot_application.build_plan).
+balanceAndPosturePlan = dict(acceleration.balanceAndPosturePlan, level="torque")
+
+
+def createTasks(robot):
+    build_plan.compilePlan(balanceAndPosturePlan).createTasks(robot)
+
+
+def createBalanceAndPosture(robot, solver, forces=None):
+    """
+    Push contacts, limits, CoM and posture tasks.
+
+    'forces' optionally maps contact names ('LF', 'RF') to the signals of
+    the measured or estimated contact wrenches.
+    """
+    plan = build_plan.compilePlan(balanceAndPosturePlan)
+    plan.createStack(robot, solver, forces)
+
+
+def initialize(robot, forces=None):
+
+    # --- create solver --- #
+    solver = Solver(robot)
+
+    # --- create tasks --- #
+    createTasks(robot)
+
+    createBalanceAndPosture(robot, solver, forces)
+
+    return solver
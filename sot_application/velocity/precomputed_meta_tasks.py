@@ -2,16 +2,13 @@
 
 # Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
 
-from numpy import eye
-
 from dynamic_graph import plug
-from dynamic_graph.sot.core.feature_generic import FeatureGeneric
 from dynamic_graph.sot.core.joint_limitator import JointLimitator
-from dynamic_graph.sot.core.matrix_util import matrixToTuple
 from dynamic_graph.sot.core.meta_task_6d import toFlags
-from dynamic_graph.sot.core.meta_task_posture import MetaTaskKinePosture
-from dynamic_graph.sot.core.meta_tasks_kine import MetaTaskKine6d, MetaTaskKineCom
-from dynamic_graph.sot.dyninv import SolverKine, TaskInequality, TaskJointLimits
+from dynamic_graph.sot.dyninv import SolverKine
+
+from sot_application import build_plan
+from sot_application.signal_util import setVector, vectorValue
 
 
 class Solver:
@@ -82,93 +79,57 @@ def setTaskLim(taskJL, robot):
     robot.dynamic.lowerJl.recompute(0)
     plug(robot.dynamic.position, taskJL.position)
     taskJL.controlGain.value = 10
-    taskJL.referenceInf.value = robot.dynamic.lowerJl.value
-    taskJL.referenceSup.value = robot.dynamic.upperJl.value
+    setVector(taskJL.referenceInf, vectorValue(robot.dynamic.lowerJl))
+    setVector(taskJL.referenceSup, vectorValue(robot.dynamic.upperJl))
     taskJL.dt.value = robot.timeStep
     taskJL.selec.value = toFlags(range(6, 22) + range(22, 28) + range(29, 35))
 
 
-def createTasks(robot):
-
-    # MetaTasks dictonary
-    robot.mTasks = dict()
-    robot.tasksIne = dict()
-
-    # Foot contacts
-    robot.contactLF = MetaTaskKine6d(
-        "contactLF", robot.dynamic, "LF", robot.OperationalPointsMap["left-ankle"]
-    )
-    robot.contactLF.feature.frame("desired")
-    robot.contactLF.gain.setConstant(10)
-    robot.contactRF = MetaTaskKine6d(
-        "contactRF", robot.dynamic, "RF", robot.OperationalPointsMap["right-ankle"]
-    )
-    robot.contactRF.feature.frame("desired")
-    robot.contactRF.gain.setConstant(10)
-
-    # MetaTasksKine6d for other operational points
-    robot.mTasks["waist"] = MetaTaskKine6d(
-        "waist", robot.dynamic, "waist", robot.OperationalPointsMap["waist"]
-    )
-    robot.mTasks["chest"] = MetaTaskKine6d(
-        "chest", robot.dynamic, "chest", robot.OperationalPointsMap["chest"]
-    )
-    robot.mTasks["rh"] = MetaTaskKine6d(
-        "rh", robot.dynamic, "rh", robot.OperationalPointsMap["right-wrist"]
-    )
-    robot.mTasks["lh"] = MetaTaskKine6d(
-        "lh", robot.dynamic, "lh", robot.OperationalPointsMap["left-wrist"]
-    )
-
-    for taskName in robot.mTasks:
-        robot.mTasks[taskName].feature.frame("desired")
-        robot.mTasks[taskName].gain.setConstant(10)
-
-    handMgrip = eye(4)
-    handMgrip[0:3, 3] = (0, 0, -0.14)
-    robot.mTasks["rh"].opmodif = matrixToTuple(handMgrip)
-    robot.mTasks["lh"].opmodif = matrixToTuple(handMgrip)
-
-    # CoM Task
-    robot.mTasks["com"] = MetaTaskKineCom(robot.dynamic)
-    robot.dynamic.com.recompute(0)
-    robot.mTasks["com"].featureDes.errorIN.value = robot.dynamic.com.value
-    robot.mTasks["com"].task.controlGain.value = 10
-    robot.mTasks["com"].feature.selec.value = "011"
-
-    # Posture Task
-    robot.mTasks["posture"] = MetaTaskKinePosture(robot.dynamic)
-    robot.mTasks["posture"].ref = robot.halfSitting
-    robot.mTasks["posture"].gain.setConstant(5)
-
-    # TASK INEQUALITY
-
-    # Task Height
-    featureHeight = FeatureGeneric("featureHeight")
-    plug(robot.dynamic.com, featureHeight.errorIN)
-    plug(robot.dynamic.Jcom, featureHeight.jacobianIN)
-    robot.tasksIne["taskHeight"] = TaskInequality("taskHeight")
-    robot.tasksIne["taskHeight"].add(featureHeight.name)
-    robot.tasksIne["taskHeight"].selec.value = "100"
-    robot.tasksIne["taskHeight"].referenceInf.value = (0.0, 0.0, 0.0)  # Xmin, Ymin
-    robot.tasksIne["taskHeight"].referenceSup.value = (0.0, 0.0, 0.80771)  # Xmax, Ymax
-    robot.tasksIne["taskHeight"].dt.value = robot.timeStep
-
+# Control graph built by createTasks and createBalance
+# (see sot_application.build_plan).
+balancePlan = {
+    "level": "velocity",
+    "tasks": {
+        "waist": {"type": "6d", "opPoint": "waist", "joint": "waist", "gain": 10},
+        "chest": {"type": "6d", "opPoint": "chest", "joint": "chest", "gain": 10},
+        "rh": {
+            "type": "6d",
+            "opPoint": "rh",
+            "joint": "right-wrist",
+            "gain": 10,
+            "offset": (0, 0, -0.14),
+        },
+        "lh": {
+            "type": "6d",
+            "opPoint": "lh",
+            "joint": "left-wrist",
+            "gain": 10,
+            "offset": (0, 0, -0.14),
+        },
+        "com": {"type": "com", "gain": 10, "selec": "011"},
+        "posture": {"type": "posture", "gain": 5},
+        "taskHeight": {
+            "type": "height",
+            "selec": "100",
+            "inf": (0.0, 0.0, 0.0),
+            "sup": (0.0, 0.0, 0.80771),
+        },
+    },
+    "contacts": {
+        "contactLF": {"opPoint": "LF", "joint": "left-ankle", "gain": 10},
+        "contactRF": {"opPoint": "RF", "joint": "right-ankle", "gain": 10},
+    },
+    "limits": True,
+    "stack": ["taskLim", "com"],
+}
 
-def createBalance(robot, solver):
 
-    solver.clear()
+def createTasks(robot):
+    build_plan.compilePlan(balancePlan).createTasks(robot)
 
-    # Task Limits
-    robot.taskLim = TaskJointLimits("taskLim")
-    setTaskLim(robot.taskLim, robot)
 
-    # --- push tasks --- #
-    solver.sot.addContact(robot.contactLF)
-    solver.sot.addContact(robot.contactRF)
-    solver.push(robot.taskLim)
-    solver.push(robot.mTasks["com"].task)
-    # solver.push(robot.mTasks['posture'].task)
+def createBalance(robot, solver):
+    build_plan.compilePlan(balancePlan).createStack(robot, solver)
 
 
 def initialize(robot):
@@ -11,9 +11,10 @@ from dynamic_graph.sot.core.feature_generic import FeatureGeneric
 from dynamic_graph.sot.core.feature_position import FeaturePosition
 from dynamic_graph.sot.core.gain_adaptive import GainAdaptive
 from dynamic_graph.sot.core.joint_limitator import JointLimitator
-from dynamic_graph.sot.core.matrix_util import matrixToTuple
 from dynamic_graph.sot.core.sot import SOT, Task
 
+from sot_application.signal_util import matrixValue, setMatrix, setVector, vectorValue
+
 
 class Solver:
     def __init__(self, robot, solverType=SOT):
@@ -77,7 +78,7 @@ def createCenterOfMassFeatureAndTask(
     plug(robot.dynamic.Jcom, featureCom.jacobianIN)
     featureCom.selec.value = selec
     featureComDes = FeatureGeneric(featureDesName)
-    featureComDes.errorIN.value = robot.dynamic.com.value
+    setVector(featureComDes.errorIN, vectorValue(robot.dynamic.com))
     featureCom.setReference(featureComDes.name)
     taskCom = Task(taskName)
     taskCom.add(featureName)
@@ -99,7 +100,7 @@ def createOperationalPointFeatureAndTask(
         featureName,
         robot.dynamic.signal(operationalPointMapped),
         robot.dynamic.signal(jacobianName),
-        robot.dynamic.signal(operationalPointMapped).value,
+        matrixValue(robot.dynamic.signal(operationalPointMapped)),
     )
     task = Task(taskName)
     task.add(featureName)
@@ -126,11 +127,10 @@ def createPostureTask(robot, taskName, ingain=1.0):
     robot.dynamic.position.recompute(0)
     feature = FeatureGeneric("feature" + taskName)
     featureDes = FeatureGeneric("featureDes" + taskName)
-    featureDes.errorIN.value = robot.halfSitting
+    setVector(featureDes.errorIN, robot.halfSitting)
     plug(robot.dynamic.position, feature.errorIN)
     feature.setReference(featureDes.name)
-    robotDim = len(robot.dynamic.position.value)
-    feature.jacobianIN.value = matrixToTuple(identity(robotDim))
+    setMatrix(feature.jacobianIN, identity(robot.dimension))
     task = Task(taskName)
     task.add(feature.name)
     gain = GainAdaptive("gain" + taskName)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+# Copyright 2013, Florent Lamiraux, Francesco Morsillo CNRS
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tasks of 'robot.mTasks' that may be shed by default.
+SHEDDABLE_TASKS = ("posture", "rh", "lh", "chest")
+
+
+def sheddableTasks(robot):
+    """
+    Returns the tasks of 'robot.mTasks' that may be shed by default
+    """
+    return [robot.mTasks[key].task for key in SHEDDABLE_TASKS if key in robot.mTasks]
+
+
+def protectedTasks(robot):
+    """
+    Returns the names of the tasks that must never be shed: contacts (every
+    robot attribute starting with 'contact'), limits and center of mass.
+    """
+    names = set()
+    for attribute, contact in vars(robot).items():
+        if attribute.startswith("contact"):
+            names.update((contact.name, contact.task.name))
+    if hasattr(robot, "taskLim"):
+        names.add(robot.taskLim.name)
+    if "com" in getattr(robot, "mTasks", dict()):
+        names.add(robot.mTasks["com"].task.name)
+    return names
+
+
+class Watchdog(object):
+    """
+    Deadline-aware load shedding around a velocity or acceleration Solver
+
+    Call 'increment(dt)' instead of 'robot.device.increment(dt)' in the
+    control loop: the solver control is computed and timed before the device
+    reads it. The solve time of each tick is compared to 'deadline' (in
+    seconds).
+
+    After 'overruns' consecutive overruns, the lowest task of the stack
+    among 'tasks' is removed. Once 'restoreAfter' consecutive ticks have
+    taken less than 'headroom * deadline', the last removed task is pushed
+    back at the position it was removed from, unless it is already in the
+    stack again. Clearing the solver forgets the removed tasks.
+
+    Every shed and restore is logged and recorded in 'history' as
+    (time, action, task name, solve time).
+    """
+
+    def __init__(
+        self, solver, deadline, tasks=None, overruns=3, headroom=0.5, restoreAfter=100
+    ):
+        self.solver = solver
+        self.deadline = deadline
+        self.overruns = overruns
+        self.headroom = headroom
+        self.restoreAfter = restoreAfter
+        if tasks is None:
+            tasks = sheddableTasks(solver.robot)
+        protected = protectedTasks(solver.robot)
+        for task in tasks:
+            if task.name in protected:
+                raise ValueError("Task {0} cannot be shed".format(task.name))
+        self.tasks = dict((task.name, task) for task in tasks)
+
+        # (task, index in the stack when it was shed), last shed at the end
+        self.shedTasks = list()
+        self.history = list()
+        self._overruns = 0
+        self._underruns = 0
+
+        # Forget the removed tasks when the stack is rebuilt.
+        clear = solver.clear
+
+        def clearAndReset():
+            clear()
+            self.reset()
+
+        solver.clear = clearAndReset
+
+    def reset(self):
+        """
+        Forget the removed tasks, without pushing them back
+        """
+        self.shedTasks = list()
+        self._overruns = 0
+        self._underruns = 0
+
+    def increment(self, dt):
+        """
+        Compute and time the solver control, then integrate the device
+        """
+        device = self.solver.robot.device
+        self.recompute(device.state.time)
+        device.increment(dt)
+
+    def recompute(self, t):
+        """
+        Compute the solver control at time 't' and check the solve time.
+
+        It must be called before anything else reads the control at time
+        't': if the control is already computed, the measured time would
+        not be the solve time, and the tick is ignored.
+        """
+        control = self.solver.sot.control
+        if control.time >= t:
+            logger.debug("control already computed at time %s, tick ignored", t)
+            return
+        start = time.perf_counter()
+        control.recompute(t)
+        self.check(t, time.perf_counter() - start)
+
+    def check(self, t, elapsed):
+        """
+        Account for a tick at time 't' that took 'elapsed' seconds
+        """
+        if elapsed > self.deadline:
+            self._underruns = 0
+            self._overruns += 1
+            if self._overruns >= self.overruns:
+                self._overruns = 0
+                self.shed(t, elapsed)
+        else:
+            self._overruns = 0
+            if elapsed < self.headroom * self.deadline and self.shedTasks:
+                self._underruns += 1
+                if self._underruns >= self.restoreAfter:
+                    self._underruns = 0
+                    self.restore(t, elapsed)
+            else:
+                self._underruns = 0
+
+    def shed(self, t, elapsed=None):
+        """
+        Remove the lowest task of the stack that may be shed.
+
+        Returns the removed task, or None if there is nothing left to shed.
+        """
+        stack = list(self.solver.toList())
+        for index in reversed(range(len(stack))):
+            task = self.tasks.get(stack[index])
+            if task is not None:
+                self.solver.rm(task)
+                self.shedTasks.append((task, index))
+                self._record(t, "shed", task, elapsed)
+                return task
+        return None
+
+    def restore(self, t, elapsed=None):
+        """
+        Push back the last removed task at the position it was removed from.
+        Removed tasks that are already in the stack again are forgotten.
+
+        Returns the restored task, or None if no task is shed.
+        """
+        stack = list(self.solver.toList())
+        while self.shedTasks and self.shedTasks[-1][0].name in stack:
+            self.shedTasks.pop()
+        if not self.shedTasks:
+            return None
+        task, index = self.shedTasks.pop()
+        self.solver.push(task)
+        stack = list(self.solver.toList())
+        index = min(index, len(stack) - 1)
+        for _ in range(stack.index(task.name) - index):
+            self.solver.sot.up(task.name)
+        for _ in range(index - stack.index(task.name)):
+            self.solver.sot.down(task.name)
+        self._record(t, "restore", task, elapsed)
+        return task
+
+    def restoreAll(self, t):
+        """
+        Push back every removed task
+        """
+        while self.shedTasks:
+            self.restore(t)
+
+    def _record(self, t, action, task, elapsed):
+        self.history.append((t, action, task.name, elapsed))
+        if action == "shed":
+            log = logger.warning
+        else:
+            log = logger.info
+        log(
+            "%s task %s at time %s (solve time %s, deadline %s)",
+            action,
+            task.name,
+            t,
+            elapsed,
+            self.deadline,
+        )